@@ -4,8 +4,10 @@ from rolling_deploy.exception import (
     AwsConnectionException
 )
 from rolling_deploy.ec2 import Ec2
+from rolling_deploy.progress import bus, ProgressEvent
+from rolling_deploy.scheduler import AzScheduler
 from botocore.exceptions import ClientError
-from time import sleep
+from time import sleep, time
 import logging
 
 class DeployerException(RollingDeployException):
@@ -15,24 +17,76 @@ class Deployer(object):
     """Class to manage rolling deployments of ec2 instances to a target group."""
 
     WAIT_TIMEOUT = 30
+    DRAIN_MARGIN = 30
 
-    def __init__(self, target_group):
+    def __init__(self, target_group, timings=None, drain_delay=None,
+        events=None, az_floor=1):
         self._target_group = target_group
+        self._timings = timings
+        self._drain_delay = drain_delay
+        self._events = events
+        self._az_floor = az_floor
+        self._deregistered = {}
+        self._drain_checked = {}
 
 
     def deploy(self, old_ami, new_ami):
         """Replace all instances running the old ami with instances
-        running the new ami.
+        running the new ami. Replacements are spread over the availability
+        zones of the old instances, and old instances are removed so that no
+        zone drops below az_floor healthy instances. If the deployer was
+        given a drain_delay, the target group's deregistration delay is
+        shortened to it for the deploy and restored afterwards.
         """
-        old_instances = self._get_ami_instances(old_ami)
+        snapshot = [(instance, state == self._target_group.HEALTH_HEALTHY) \
+            for instance, state in self._target_group.instance_health()
+        ]
+        old_instances = [instance for instance, healthy in snapshot \
+            if instance.ami() == old_ami
+        ]
         logging.info("Replacing %d instances running ami %s with ami %s" %
             (len(old_instances), old_ami, new_ami)
         )
-        for instance in old_instances:
-            self._roll_in(new_ami)
-            self._roll_out(instance)
+        if not old_instances:
+            return
+        if not Ec2.ami_exists(new_ami, self._target_group.session()):
+            raise DeployerException("Unable to find requested image %s" % \
+                (new_ami,)
+            )
+        scheduler = AzScheduler(snapshot, old_instances, self._az_floor)
+        original_delay = None
+        if self._drain_delay is not None:
+            original_delay = self._target_group.deregistration_delay()
+            logging.info("Setting deregistration delay to %d seconds." %
+                (self._drain_delay,)
+            )
+            self._target_group.set_deregistration_delay(self._drain_delay)
+
+        draining = []
+        try:
+            for wave in range(len(old_instances)):
+                scheduler.launched(
+                    self._roll_in(new_ami, scheduler.launch_zone(),
+                        check_ami=False
+                    )
+                )
+                instance = scheduler.next_removal()
+                self._roll_out(instance)
+                scheduler.removed(instance)
+                draining = self._release_drained(draining + [instance])
+                bus.emit(ProgressEvent.KIND_WAVE_COMPLETE, wave=wave + 1,
+                    waves=len(old_instances),
+                    target_group=self._target_group.arn()
+                )
 
-        self._clean_up(old_instances)
+            self._clean_up(draining)
+        finally:
+            if original_delay is not None:
+                logging.info("Restoring deregistration delay to %d seconds." %
+                    (original_delay,)
+                )
+                self._target_group.set_deregistration_delay(original_delay)
+            bus.flush()
 
     def _get_ami_instances(self, ami, healthy=False):
         """Get all instances in target group running the an ami."""
@@ -43,43 +97,132 @@ class Deployer(object):
             instances = [instance for instance in instances if instance.healthy()]
         return instances
 
-    def _roll_in(self, ami):
+    def _roll_in(self, ami, availability_zone=None, check_ami=True):
         """Add a new instance to the target group with the new ami."""
-        new_instance = Ec2.create_instance(ami)
-        new_instance.wait_ready()
+        new_instance = Ec2.create_instance(ami, self._target_group.session(),
+            availability_zone, check_ami
+        )
+        new_instance.wait_ready(self._timings, self._events)
 
         self._target_group.add_instance(new_instance)
-        self._target_group.wait_healthy(new_instance)
+        self._target_group.wait_healthy(new_instance, self._timings)
+        return new_instance
 
     def _roll_out(self, instance):
         """Remove an instance from the target group."""
-        logging.info("Removing instance %s from target group." % \
-            (instance.id(),)
-        )
         self._target_group.remove_instance(instance)
+        self._deregistered[instance.id()] = time()
+        bus.emit(ProgressEvent.KIND_DRAINING, instance.id(),
+            target_group=self._target_group.arn()
+        )
+
+    def _drained(self, instance, health):
+        """Is the instance safe to terminate given its target health? It is
+        once the target group no longer routes to it, or once it has been
+        draining for the full deregistration delay.
+        """
+        if health is None or \
+            health['State'] == self._target_group.HEALTH_UNUSED:
+            return True
+        if health['State'] != self._target_group.HEALTH_DRAINING:
+            return False
+        remaining = self._drain_remaining(instance)
+        return remaining is not None and remaining <= 0
+
+    def _release_drained(self, instances):
+        """Terminate the removed instances that have finished draining,
+        checked with a single target health call for just those instances.
+        Returns the instances still draining.
+        """
+        if not instances:
+            return []
+        healths = self._target_group.target_healths(instances)
+        draining = []
+        for instance in instances:
+            if not self._drained(instance, healths.get(instance.id())):
+                self._drain_checked[instance.id()] = time()
+                draining.append(instance)
+                continue
+            if self._timings and instance.id() in self._deregistered:
+                start = self._deregistered[instance.id()]
+                self._timings.record(self._timings.KIND_DRAIN,
+                    self._timings.estimate(start,
+                        self._drain_checked.get(instance.id(), start), time()
+                    ), target_group=self._target_group.arn()
+                )
+            instance.terminate()
+        return draining
+
+    def _drain_remaining(self, instance):
+        """Seconds left before the deregistration delay of an instance
+        removed by this deployer runs out, or None if it wasn't.
+        """
+        deregistered = self._deregistered.get(instance.id())
+        if deregistered is None:
+            return None
+        return self._target_group.deregistration_delay() - \
+            (time() - deregistered)
 
     def wait_drained(self, instance, wait_interval=10):
-        """Wait for instance to be drained from the target_group."""
-        poll = 0
-        targets = [ec2.id() for ec2 in self._target_group.instances()]
-        while instance.id() in targets and poll < self.WAIT_TIMEOUT:
-            logging.info("Waiting for instance %s to drain from target group." %
-                (instance.id(),)
+        """Wait for instance to be drained from the target_group. Polls are
+        cut short to land when the deregistration delay runs out, and an
+        instance removed by this deployer is waited on until DRAIN_MARGIN
+        seconds past its delay. Other instances get WAIT_TIMEOUT polls. When
+        a TimingStore was passed to the deployer, the first poll and the poll
+        limit are tuned from the drain times previously observed for this
+        target group.
+        """
+        start = self._deregistered.get(instance.id(), time())
+        limit = self.WAIT_TIMEOUT
+        if self._timings:
+            first_wait, limit = self._timings.schedule(
+                self._timings.KIND_DRAIN, wait_interval, limit,
+                target_group=self._target_group.arn()
             )
-            targets = [ec2.id() for ec2 in self._target_group.instances()]
-            sleep(wait_interval)
-            poll += 1
+            sleep(max(first_wait - (time() - start), 0))
+
+        deadline = None
+        remaining = self._drain_remaining(instance)
+        if remaining is not None:
+            deadline = time() + max(remaining, 0) + self.DRAIN_MARGIN
 
-        if poll >= self.WAIT_TIMEOUT:
+        poll = 0
+        last_miss = start
+        health = self._target_group.target_health(instance)
+        drained = self._drained(instance, health)
+        try:
+            while not drained and (poll < limit if deadline is None \
+                else time() < deadline):
+                last_miss = time()
+                logging.debug("Instance %s is %s (%s)." % \
+                    (instance.id(), health['State'], health.get('Reason', ''),)
+                )
+                bus.waiting(ProgressEvent.KIND_DRAINING, instance.id())
+                remaining = self._drain_remaining(instance)
+                if remaining is None:
+                    sleep(wait_interval)
+                else:
+                    sleep(max(min(wait_interval, remaining), 0))
+                health = self._target_group.target_health(instance)
+                drained = self._drained(instance, health)
+                poll += 1
+        finally:
+            bus.done_waiting(ProgressEvent.KIND_DRAINING, instance.id())
+
+        if not drained:
             raise DeployerException(
                 "Instance %s is not draining from the target group." %
                 (instance.id(),)
             )
+        if self._timings:
+            self._timings.record(self._timings.KIND_DRAIN,
+                self._timings.estimate(start, last_miss, time()),
+                target_group=self._target_group.arn()
+            )
         return True
 
     def _clean_up(self, instances, wait_interval=5):
-        """Terminate any old instances."""
+        """Wait for any old instances still draining, then terminate them."""
         for instance in instances:
             self.wait_drained(instance, wait_interval)
-            logging.info("Terminating instance %s" % (instance.id(),))
             instance.terminate()
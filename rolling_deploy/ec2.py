@@ -3,8 +3,10 @@ from rolling_deploy.exception import (
     RollingDeployException, 
     AwsConnectionException
 )
+from rolling_deploy.progress import bus, ProgressEvent
+from rolling_deploy.session import client as aws_client
 from botocore.exceptions import ClientError
-from time import sleep
+from time import sleep, time
 import logging
 
 class Ec2Exception(RollingDeployException):
@@ -21,8 +23,11 @@ class Ec2(object):
     WAIT_INTERVAL = 10
     WAIT_LIMIT = 30
 
-    def __init__(self, InstanceId=None):
-        self._client = self._get_client()
+    DESCRIBE_BATCH = 100
+
+    def __init__(self, InstanceId=None, session=None):
+        self._session = session
+        self._client = self._get_client(session)
         self._load_instance(InstanceId)
 
     def terminate(self):
@@ -34,6 +39,7 @@ class Ec2(object):
                 "Error attempting to terminate instance %s:\n %s" % \
                 (self.id(), str(e),)
             )
+        bus.emit(ProgressEvent.KIND_TERMINATED, self.id())
 
     def state(self):
         """The current state of this instance."""
@@ -44,22 +50,71 @@ class Ec2(object):
         """The ami id of this instance."""
         return self._ec2_data['ImageId']
 
+    def availability_zone(self):
+        """The availability zone this instance is placed in."""
+        return self._ec2_data['Placement']['AvailabilityZone']
+
+    def instance_type(self):
+        """The instance type of this instance."""
+        return self._ec2_data['InstanceType']
+
     def ready(self):
         """This instance is running."""
         return self.state() == self.STATE_RUNNING
 
-    def wait_ready(self):
-        """Poll instance until it's in ready state."""
-        poll = 0
-        while not self.ready() and poll < self.WAIT_LIMIT:
-            logging.info("Waiting for ec2 %s to become ready." % (self.id(),))
-            sleep(self.WAIT_INTERVAL)
-            poll += 1
-
-        if poll >= self.WAIT_LIMIT:
-            raise Ec2Exception("Instance %s took too long to become ready." % \
-                (self.id(),)
+    def wait_ready(self, timings=None, events=None):
+        """Poll instance until it's in ready state, giving up once the
+        WAIT_LIMIT polls of WAIT_INTERVAL seconds have elapsed. When a
+        TimingStore is passed, the first poll and the deadline are tuned from
+        the boot times previously observed for this ami and instance type.
+        When an InstanceEventSource is passed, the instance is checked as soon
+        as it is notified running and otherwise only polled as a slow
+        fallback. A notification describe_instances hasn't caught up with
+        yet is followed by normal polling.
+        """
+        start = time()
+        first_wait = 0
+        limit = self.WAIT_LIMIT
+        if timings:
+            first_wait, limit = timings.schedule(timings.KIND_BOOT,
+                self.WAIT_INTERVAL, limit, ami=self.ami(),
+                instance_type=self.instance_type()
+            )
+        deadline = start + first_wait + limit * self.WAIT_INTERVAL
+
+        notified = False
+        if events:
+            notified = events.wait(self.id(), (self.STATE_RUNNING,), first_wait)
+        else:
+            sleep(first_wait)
+
+        last_miss = start
+        try:
+            while not self.ready():
+                last_miss = time()
+                if last_miss >= deadline:
+                    raise Ec2Exception(
+                        "Instance %s took too long to become ready." % \
+                        (self.id(),)
+                    )
+                bus.waiting(ProgressEvent.KIND_READY, self.id())
+                remaining = deadline - last_miss
+                if events and not notified:
+                    notified = events.wait(self.id(), (self.STATE_RUNNING,),
+                        min(self.WAIT_INTERVAL * events.FALLBACK_FACTOR,
+                            remaining)
+                    )
+                else:
+                    sleep(min(self.WAIT_INTERVAL, remaining))
+        finally:
+            bus.done_waiting(ProgressEvent.KIND_READY, self.id())
+
+        if timings:
+            timings.record(timings.KIND_BOOT,
+                timings.estimate(start, last_miss, time()), ami=self.ami(),
+                instance_type=self.instance_type()
             )
+        bus.emit(ProgressEvent.KIND_READY, self.id())
         return True
 
     def _load_instance(self, instance_id):
@@ -78,15 +133,63 @@ class Ec2(object):
         """Return the instance id."""
         return self._ec2_data['InstanceId']
 
+    def session(self):
+        """The boto3 session this instance was loaded with, or None for the
+        default session.
+        """
+        return self._session
+
+    @classmethod
+    def _from_data(cls, data, session=None, client=None):
+        """Helper method to build an Ec2 object from already described
+        instance data, without another api call.
+        """
+        instance = cls.__new__(cls)
+        instance._session = session
+        instance._client = client or cls._get_client(session)
+        instance._ec2_data = data
+        return instance
+
+    @classmethod
+    def load_instances(cls, instance_ids, session=None):
+        """Factory method to load many instances with one describe call per
+        DESCRIBE_BATCH ids, in the order of instance_ids.
+        """
+        client = cls._get_client(session)
+        instances = {}
+        instance_ids = list(instance_ids)
+        for start in range(0, len(instance_ids), cls.DESCRIBE_BATCH):
+            batch = instance_ids[start:start + cls.DESCRIBE_BATCH]
+            try:
+                pages = client.get_paginator('describe_instances').paginate(
+                    InstanceIds=batch
+                )
+                for page in pages:
+                    for reservation in page['Reservations']:
+                        for data in reservation['Instances']:
+                            instances[data['InstanceId']] = \
+                                cls._from_data(data, session, client)
+            except ClientError as e:
+                raise Ec2Exception("Instances %s Not Found:\n %s" % \
+                    (", ".join(batch), str(e),)
+                )
+
+        missing = [instance_id for instance_id in instance_ids \
+            if instance_id not in instances
+        ]
+        if missing:
+            raise Ec2Exception("Instances %s Not Found" % (", ".join(missing),))
+        return [instances[instance_id] for instance_id in instance_ids]
+
     @staticmethod
-    def _get_client():
+    def _get_client(session=None):
         """Helper method to get the boto3 ec2 client."""
-        return boto3.client('ec2')
+        return aws_client('ec2', session)
 
     @staticmethod
-    def ami_exists(image_id):
+    def ami_exists(image_id, session=None):
         """Helper method to ensure an ami-id exists in aws."""
-        client = Ec2._get_client()
+        client = Ec2._get_client(session)
         try:
             response = client.describe_images(ImageIds=(image_id,))
             return len(response['Images']) > 0
@@ -94,20 +197,29 @@ class Ec2(object):
             return False
 
     @classmethod
-    def create_instance(cls, image_id):
-        """Factory method to create a new ec2 instance."""
-        client = cls._get_client()
-        if not cls.ami_exists(image_id):
+    def create_instance(cls, image_id, session=None, availability_zone=None,
+        check_ami=True):
+        """Factory method to create a new ec2 instance, optionally placed in
+        an availability zone. Pass check_ami=False when the ami is already
+        known to exist.
+        """
+        client = cls._get_client(session)
+        if check_ami and not cls.ami_exists(image_id, session):
             raise Ec2Exception('Unable to find requested image')
 
+        placement = {}
+        if availability_zone:
+            placement['Placement'] = {"AvailabilityZone": availability_zone}
         try:
             response = client.run_instances(ImageId=image_id, MaxCount=1, 
-                MinCount=1
+                MinCount=1, **placement
             )
-            return cls(response['Instances'][0]['InstanceId'])
+            instance = cls._from_data(response['Instances'][0], session, client)
         except (ClientError, IndexError) as e:
             raise Ec2Exception(
                 "An error occurred when creating ec2 instance.\n %s" % \
                 (str(e),)
             )
+        bus.emit(ProgressEvent.KIND_LAUNCHED, instance.id(), ami=image_id)
+        return instance
 
@@ -0,0 +1,160 @@
+import json
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from threading import Condition, Event, Thread
+from time import time
+from rolling_deploy.exception import RollingDeployException
+from rolling_deploy.session import client as aws_client
+import logging
+
+class EventSourceException(RollingDeployException):
+    """Event Source Logic Exception."""
+
+class InstanceEventSource(object):
+    """Collects ec2 instance state change notifications and wakes waiters as
+    soon as an instance reaches the state they are waiting for. Publish
+    events directly to use it as an in-memory source.
+    """
+
+    FALLBACK_FACTOR = 6
+
+    def __init__(self):
+        self._states = {}
+        self._condition = Condition()
+
+    def publish(self, instance_id, state):
+        """Record the latest state of an instance and wake its waiters."""
+        with self._condition:
+            self._states[instance_id] = state
+            self._condition.notify_all()
+
+    def state(self, instance_id):
+        """The last state notified for an instance, or None."""
+        with self._condition:
+            return self._states.get(instance_id)
+
+    def wait(self, instance_id, states, timeout):
+        """Block until the instance is notified in one of states or timeout
+        seconds pass. Returns whether one of the states was reached.
+        """
+        deadline = time() + timeout
+        with self._condition:
+            while self._states.get(instance_id) not in states:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def start(self):
+        """Start receiving notifications. In-memory sources have nothing to
+        receive.
+        """
+
+    def stop(self):
+        """Stop receiving notifications."""
+
+class QueueEventSource(InstanceEventSource):
+    """An InstanceEventSource fed by an sqs queue subscribed to EventBridge
+    "EC2 Instance State-change Notification" events, directly or via sns.
+    """
+
+    DETAIL_TYPE = 'EC2 Instance State-change Notification'
+    RECEIVE_WAIT = 20
+    RECEIVE_BATCH = 10
+
+    def __init__(self, queue_url, session=None):
+        super(QueueEventSource, self).__init__()
+        self._queue_url = queue_url
+        self._client = aws_client('sqs', session,
+            self.region_from_url(queue_url)
+        )
+        self._stopped = Event()
+        self._thread = None
+
+    def start(self):
+        """Start a background thread receiving from the queue."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = Thread(target=self._receive_forever,
+                name="events/%s" % (self._queue_url.split('/')[-1],)
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current receive."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _receive_forever(self):
+        """Helper method receiving from the queue until stopped."""
+        while not self._stopped.is_set():
+            try:
+                self.receive()
+            except EventSourceException as e:
+                logging.warning(str(e))
+                self._stopped.wait(self.RECEIVE_WAIT)
+
+    def receive(self, wait_seconds=None):
+        """Receive one batch of notifications from the queue, publish them
+        and delete them. Returns the number of state changes published.
+        """
+        if wait_seconds is None:
+            wait_seconds = self.RECEIVE_WAIT
+        try:
+            messages = self._client.receive_message(
+                QueueUrl=self._queue_url, WaitTimeSeconds=wait_seconds,
+                MaxNumberOfMessages=self.RECEIVE_BATCH
+            ).get('Messages', [])
+            if messages:
+                self._client.delete_message_batch(QueueUrl=self._queue_url,
+                    Entries=[{"Id": str(index),
+                        "ReceiptHandle": message['ReceiptHandle']} \
+                        for index, message in enumerate(messages)
+                    ]
+                )
+        except (ClientError, BotoCoreError) as e:
+            raise EventSourceException("Unable to receive from queue %s:\n %s" \
+                % (self._queue_url, str(e),)
+            )
+
+        published = 0
+        for message in messages:
+            change = self._parse(message['Body'])
+            if change:
+                self.publish(*change)
+                published += 1
+        return published
+
+    @classmethod
+    def _parse(cls, body):
+        """Helper method returning the (instance_id, state) of a notification
+        body, or None if it isn't an instance state change.
+        """
+        try:
+            event = json.loads(body)
+            if 'Message' in event and 'detail-type' not in event:
+                event = json.loads(event['Message'])
+            if event.get('detail-type') != cls.DETAIL_TYPE:
+                return None
+            return event['detail']['instance-id'], event['detail']['state']
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def region_from_url(queue_url):
+        """Get the region of an sqs queue url."""
+        host = queue_url.split('/')[2]
+        if host.startswith('sqs.'):
+            return host.split('.')[1]
+        if host.endswith('.queue.amazonaws.com'):
+            return host.split('.')[0]
+        return None
+
+    @staticmethod
+    def account_from_url(queue_url):
+        """Get the account of an sqs queue url."""
+        return queue_url.split('/')[3]
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import current_thread
+from rolling_deploy.exception import RollingDeployException
+from rolling_deploy.deployer import Deployer
+from rolling_deploy.target_group import TargetGroup
+from rolling_deploy.session import SessionFactory
+from rolling_deploy.events import QueueEventSource
+import logging
+
+class FleetException(RollingDeployException):
+    """Fleet Deployment Logic Exception."""
+
+class FleetDeployer(object):
+    """Class to run rolling deployments of target groups spread across
+    regions and accounts, one worker per region and account. Workers whose
+    region and account have an event queue wait on its instance state
+    change notifications instead of polling.
+    """
+
+    def __init__(self, sessions=None, role_arns=(), timings=None,
+        drain_delay=None, workers=None, event_queues=(), az_floor=1):
+        self._sessions = sessions or SessionFactory()
+        self._role_arns = dict((SessionFactory.account_from_arn(arn), arn) \
+            for arn in role_arns
+        )
+        self._timings = timings
+        self._drain_delay = drain_delay
+        self._workers = workers
+        self._az_floor = az_floor
+        self._event_queues = dict(((QueueEventSource.region_from_url(url),
+            QueueEventSource.account_from_url(url)), url) \
+            for url in event_queues
+        )
+        self._jobs = {}
+
+    def add_target_group(self, target_group_arn, old_ami, new_ami):
+        """Queue a target group to have old_ami replaced with new_ami. Target
+        groups sharing a region and account are deployed one after another.
+        """
+        region = SessionFactory.region_from_arn(target_group_arn)
+        account = SessionFactory.account_from_arn(target_group_arn)
+        self._jobs.setdefault((region, account), []).append(
+            (target_group_arn, old_ami, new_ami)
+        )
+
+    def deploy(self):
+        """Run every queued deploy, returning a dict of target group arn to
+        the exception it failed with, or None. Any error is recorded against
+        its target group so one region failing never hides the outcome of
+        the others. Raises once all workers have finished if any deploy
+        failed.
+        """
+        if not self._jobs:
+            return {}
+
+        results = {}
+        workers = self._workers or len(self._jobs)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._deploy_context, region, account,
+                jobs) for (region, account), jobs in self._jobs.items()
+            ]
+            for future in futures:
+                results.update(future.result())
+
+        failed = [arn for arn, error in results.items() if error is not None]
+        if failed:
+            raise FleetException("Deploy failed for target groups:\n %s" % \
+                ("\n ".join("%s: %s" % (arn, results[arn]) for arn in failed),)
+            )
+        return results
+
+    def _deploy_context(self, region, account, jobs):
+        """Deploy every target group queued for a region and account with its
+        own session.
+        """
+        current_thread().name = "%s/%s" % (account, region)
+        results = {}
+        try:
+            session = self._sessions.get_session(region,
+                self._role_arns.get(account)
+            )
+        except Exception as e:
+            logging.error("Unable to get a session for %s/%s: %s" % \
+                (account, region, str(e),)
+            )
+            return dict((arn, e) for arn, old_ami, new_ami in jobs)
+
+        events = None
+        if (region, account) in self._event_queues:
+            events = QueueEventSource(self._event_queues[(region, account)],
+                session
+            )
+            events.start()
+
+        try:
+            for target_group_arn, old_ami, new_ami in jobs:
+                try:
+                    deployer = Deployer(TargetGroup(target_group_arn, session),
+                        self._timings, self._drain_delay, events,
+                        self._az_floor
+                    )
+                    deployer.deploy(old_ami, new_ami)
+                    results[target_group_arn] = None
+                except Exception as e:
+                    logging.error("Deploy of target group %s failed: %s" % \
+                        (target_group_arn, str(e),)
+                    )
+                    results[target_group_arn] = e
+        finally:
+            if events:
+                events.stop()
+        return results
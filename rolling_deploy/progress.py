@@ -0,0 +1,222 @@
+import json
+import logging
+from collections import namedtuple
+from threading import Lock, current_thread
+from time import time
+
+class ProgressEvent(namedtuple('ProgressEvent',
+    ('kind', 'time', 'worker', 'instance_id', 'detail'))):
+    """A single deploy progress event."""
+
+    KIND_LAUNCHED = 'launched'
+    KIND_READY = 'ready'
+    KIND_HEALTHY = 'healthy'
+    KIND_DRAINING = 'draining'
+    KIND_TERMINATED = 'terminated'
+    KIND_WAVE_COMPLETE = 'wave_complete'
+    KIND_WAITING = 'waiting'
+    KIND_API_CALLS = 'api_calls'
+
+    def to_dict(self):
+        """This event as a json serializable dict."""
+        return dict(self._asdict())
+
+class ProgressBus(object):
+    """Dispatches deploy progress events to subscribed sinks. Lifecycle
+    events are sent straight away, while waits and api call counts are
+    coalesced and sent at most once every FLUSH_INTERVAL seconds.
+    """
+
+    FLUSH_INTERVAL = 5
+    THROTTLE_CODES = ('Throttling', 'ThrottlingException',
+        'RequestLimitExceeded', 'TooManyRequestsException'
+    )
+
+    def __init__(self):
+        self._sinks = []
+        self._lock = Lock()
+        self._dispatch_lock = Lock()
+        self._waiting = {}
+        self._calls = {}
+        self._throttles = {}
+        self._last_flush = time()
+
+    def subscribe(self, sink):
+        """Send events to sink, a callable taking a ProgressEvent."""
+        with self._lock:
+            self._sinks.append(sink)
+
+    def unsubscribe(self, sink):
+        """Stop sending events to sink."""
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def emit(self, kind, instance_id=None, **detail):
+        """Send a lifecycle event to every sink."""
+        self._dispatch([self._event(kind, instance_id, detail)] + \
+            self._due_events()
+        )
+
+    def waiting(self, wait, instance_id):
+        """Note that an instance is still being waited on. Waits are
+        coalesced into one waiting event per flush.
+        """
+        with self._lock:
+            self._waiting.setdefault(wait, set()).add(instance_id)
+        self._dispatch(self._due_events())
+
+    def done_waiting(self, wait, instance_id):
+        """Note that an instance is no longer being waited on."""
+        with self._lock:
+            self._waiting.get(wait, set()).discard(instance_id)
+
+    def count_call(self, operation, error_code=None):
+        """Count an api call, and whether it was throttled."""
+        with self._lock:
+            self._calls[operation] = self._calls.get(operation, 0) + 1
+            if error_code in self.THROTTLE_CODES:
+                self._throttles[operation] = \
+                    self._throttles.get(operation, 0) + 1
+
+    def counts(self):
+        """Get copies of the api call and throttle counts per operation."""
+        with self._lock:
+            return dict(self._calls), dict(self._throttles)
+
+    def instrument(self, client):
+        """Count every http attempt made by a boto3 client, so throttled
+        attempts botocore retried are counted as well as the final one.
+        """
+        def attempted(operation, response=None, **kwargs):
+            parsed = response[1] if response else {}
+            self.count_call(operation.name,
+                (parsed or {}).get('Error', {}).get('Code')
+            )
+        client.meta.events.register('needs-retry', attempted)
+        return client
+
+    def flush(self):
+        """Send any coalesced events now."""
+        self._dispatch(self._due_events(force=True))
+
+    def _event(self, kind, instance_id, detail):
+        """Helper method to stamp a new event."""
+        return ProgressEvent(kind, time(), current_thread().name, instance_id,
+            detail
+        )
+
+    def _due_events(self, force=False):
+        """Helper method returning the coalesced events, if a flush is due."""
+        with self._lock:
+            if not self._sinks or \
+                (not force and time() - self._last_flush < self.FLUSH_INTERVAL):
+                return []
+            self._last_flush = time()
+            events = []
+            waiting = dict((wait, sorted(ids)) for wait, ids in \
+                self._waiting.items() if ids
+            )
+            if waiting:
+                events.append(self._event(ProgressEvent.KIND_WAITING, None,
+                    waiting
+                ))
+            if self._calls:
+                events.append(self._event(ProgressEvent.KIND_API_CALLS, None, {
+                    "calls": dict(self._calls),
+                    "throttles": dict(self._throttles),
+                }))
+            return events
+
+    def _dispatch(self, events):
+        """Helper method sending events to every sink, in order."""
+        if not events:
+            return
+        with self._lock:
+            sinks = list(self._sinks)
+        with self._dispatch_lock:
+            for event in events:
+                for sink in sinks:
+                    sink(event)
+
+class JsonLinesSink(object):
+    """Writes each event as a line of json to a stream."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __call__(self, event):
+        self._stream.write(json.dumps(event.to_dict()) + "\n")
+        self._stream.flush()
+
+class LogSink(object):
+    """Writes each event to the log."""
+
+    def __call__(self, event):
+        if event.kind == ProgressEvent.KIND_WAITING:
+            logging.info("Waiting on %s." % (", ".join("%d %s" % \
+                (len(ids), wait) for wait, ids in sorted(event.detail.items())),)
+            )
+        elif event.kind == ProgressEvent.KIND_API_CALLS:
+            logging.info("%d api calls, %d throttled." % (
+                sum(event.detail['calls'].values()),
+                sum(event.detail['throttles'].values()),
+            ))
+        else:
+            logging.info("[%s] %s %s %s" % (event.worker, event.kind,
+                event.instance_id or '', json.dumps(event.detail),
+            ))
+
+class TerminalSink(object):
+    """Keeps a single status line on a terminal up to date, printing wave
+    completions above it.
+    """
+
+    RENDER_INTERVAL = 0.5
+    COUNTED = (ProgressEvent.KIND_LAUNCHED, ProgressEvent.KIND_READY,
+        ProgressEvent.KIND_HEALTHY, ProgressEvent.KIND_DRAINING,
+        ProgressEvent.KIND_TERMINATED,
+    )
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._counts = dict((kind, 0) for kind in self.COUNTED)
+        self._waiting = 0
+        self._calls = 0
+        self._throttles = 0
+        self._last_render = 0
+
+    def __call__(self, event):
+        if event.kind in self._counts:
+            self._counts[event.kind] += 1
+        elif event.kind == ProgressEvent.KIND_WAITING:
+            self._waiting = sum(len(ids) for ids in event.detail.values())
+        elif event.kind == ProgressEvent.KIND_API_CALLS:
+            self._calls = sum(event.detail['calls'].values())
+            self._throttles = sum(event.detail['throttles'].values())
+        elif event.kind == ProgressEvent.KIND_WAVE_COMPLETE:
+            self._stream.write("\r\x1b[K[%s] wave %d/%d complete\n" % \
+                (event.worker, event.detail['wave'], event.detail['waves'],)
+            )
+            self._last_render = 0
+
+        if time() - self._last_render >= self.RENDER_INTERVAL:
+            self._render()
+
+    def _render(self):
+        """Helper method redrawing the status line."""
+        self._last_render = time()
+        self._stream.write("\r\x1b[K%s | waiting %d | api %d (%d throttled)" % (
+            " ".join("%s %d" % (kind, self._counts[kind]) \
+                for kind in self.COUNTED),
+            self._waiting, self._calls, self._throttles,
+        ))
+        self._stream.flush()
+
+    def close(self):
+        """Draw the final status and end the line."""
+        self._render()
+        self._stream.write("\n")
+        self._stream.flush()
+
+bus = ProgressBus()
@@ -0,0 +1,127 @@
+from rolling_deploy.exception import RollingDeployException
+
+class SchedulerException(RollingDeployException):
+    """Availability Zone Scheduling Exception."""
+
+class AzScheduler(object):
+    """Chooses where to launch replacement instances and which old instance
+    to remove next, keeping the healthy instances of every availability zone
+    at or above a floor. Raises straight away if the floor can't be kept.
+    Works from a single placement snapshot kept up to date by the deployer,
+    so scheduling makes no api calls.
+    """
+
+    def __init__(self, snapshot, old_instances, floor=1):
+        self._floor = floor
+        self._zones = {}
+        self._healthy = set()
+        for instance, healthy in snapshot:
+            self._zones[instance.id()] = instance.availability_zone()
+            if healthy:
+                self._healthy.add(instance.id())
+        self._old = list(old_instances)
+        self._new = []
+        self._targets = self._target_counts()
+        self._check_floor()
+
+    def _target_counts(self):
+        """Helper method spreading the replacements evenly over the zones the
+        old instances are in, extra replacements going to the zones that had
+        the most old instances.
+        """
+        counts = self._count(self._old)
+        if not counts:
+            return {}
+        zones = sorted(counts, key=lambda zone: (-counts[zone], zone))
+        targets = dict((zone, len(self._old) // len(zones)) for zone in zones)
+        for zone in zones[:len(self._old) % len(zones)]:
+            targets[zone] += 1
+        return targets
+
+    def _check_floor(self):
+        """Helper method raising if some zone with healthy old instances
+        would end up below the floor once its old instances are replaced,
+        so a deploy that can't finish fails before launching anything.
+        """
+        old = set(instance.id() for instance in self._old)
+        final = dict(self._targets)
+        for instance_id in self._healthy - old:
+            zone = self._zones[instance_id]
+            final[zone] = final.get(zone, 0) + 1
+        short = sorted(zone for zone in self._count(self._old, healthy=True) \
+            if final.get(zone, 0) < self._floor
+        )
+        if short:
+            raise SchedulerException(
+                "Availability zones %s can't keep %d healthy instances once "
+                "their old instances are replaced." % \
+                (", ".join(short), self._floor,)
+            )
+
+    def _count(self, instances, healthy=False):
+        """Helper method counting instances per zone."""
+        counts = {}
+        for instance in instances:
+            if healthy and instance.id() not in self._healthy:
+                continue
+            zone = self._zones[instance.id()]
+            counts[zone] = counts.get(zone, 0) + 1
+        return counts
+
+    def healthy_counts(self):
+        """Get the number of healthy instances per zone."""
+        counts = dict((zone, 0) for zone in self._zones.values())
+        for instance_id in self._healthy:
+            counts[self._zones[instance_id]] += 1
+        return counts
+
+    def remaining(self):
+        """Get the old instances not yet removed."""
+        return list(self._old)
+
+    def launch_zone(self):
+        """Get the zone the next replacement should be launched in: the one
+        furthest below its share of replacements.
+        """
+        if not self._targets:
+            return None
+        launched = self._count(self._new)
+        old = self._count(self._old)
+        return max(sorted(self._targets), key=lambda zone: (
+            self._targets[zone] - launched.get(zone, 0), old.get(zone, 0)
+        ))
+
+    def launched(self, instance, healthy=True):
+        """Record a replacement instance joining the target group."""
+        self._zones[instance.id()] = instance.availability_zone()
+        self._new.append(instance)
+        if healthy:
+            self._healthy.add(instance.id())
+
+    def next_removal(self):
+        """Get the old instance to remove next, taken from the zone with the
+        most healthy capacity above the floor. Raises if every removal would
+        take a zone below the floor.
+        """
+        healthy = self.healthy_counts()
+        candidates = []
+        for instance in self._old:
+            zone = self._zones[instance.id()]
+            if instance.id() not in self._healthy:
+                # removing an unhealthy instance costs no capacity
+                candidates.append(((1, 0), instance))
+            elif healthy[zone] - 1 >= self._floor:
+                candidates.append(((0, healthy[zone] - self._floor), instance))
+        if not candidates:
+            raise SchedulerException(
+                "Removing any of %s would leave an availability zone with "
+                "fewer than %d healthy instances." % \
+                (", ".join(instance.id() for instance in self._old),
+                self._floor,)
+            )
+        return max(candidates, key=lambda candidate: candidate[0])[1]
+
+    def removed(self, instance):
+        """Record an old instance leaving the target group."""
+        self._old = [old for old in self._old if old.id() != instance.id()]
+        self._healthy.discard(instance.id())
@@ -0,0 +1,114 @@
+import os
+import boto3
+import botocore.session
+from botocore.credentials import RefreshableCredentials
+from botocore.exceptions import ClientError
+from threading import Lock
+from rolling_deploy.exception import AwsConnectionException
+from rolling_deploy.progress import bus
+
+_clients = {}
+_clients_lock = Lock()
+
+def client(service, session=None, region_name=None):
+    """Get a boto3 client from session, or the default session, sending
+    requests to AWS_ENDPOINT_URL when it is set, e.g. a local moto server.
+    Clients are thread safe, so one is shared per session, service, region
+    and endpoint rather than built for every object.
+    """
+    endpoint = os.environ.get('AWS_ENDPOINT_URL')
+    key = (session, service, region_name, endpoint)
+    with _clients_lock:
+        if key not in _clients:
+            options = {}
+            if region_name:
+                options['region_name'] = region_name
+            if endpoint:
+                options['endpoint_url'] = endpoint
+            _clients[key] = bus.instrument(
+                (session or boto3).client(service, **options)
+            )
+        return _clients[key]
+
+class SessionFactory(object):
+    """Builds and caches boto3 sessions per region and assumed role, so each
+    region of a deploy can be given its own session context.
+    """
+
+    ROLE_SESSION_NAME = 'rolling-deploy'
+
+    def __init__(self, profile_name=None):
+        self._profile_name = profile_name
+        self._sessions = {}
+        self._lock = Lock()
+
+    def get_session(self, region=None, role_arn=None):
+        """Get a session for a region, assuming role_arn if passed. Sessions
+        for assumed roles refresh their credentials before they expire.
+        """
+        key = (region, role_arn)
+        with self._lock:
+            if key not in self._sessions:
+                if role_arn:
+                    session = self._assume_role_session(region, role_arn)
+                else:
+                    session = boto3.Session(region_name=region,
+                        profile_name=self._profile_name
+                    )
+                self._sessions[key] = session
+            return self._sessions[key]
+
+    def _assume_role_session(self, region, role_arn):
+        """Helper method to build a session with refreshable assumed role
+        credentials.
+        """
+        options = {}
+        if os.environ.get('AWS_ENDPOINT_URL'):
+            options['endpoint_url'] = os.environ['AWS_ENDPOINT_URL']
+        sts = bus.instrument(boto3.Session(region_name=region,
+            profile_name=self._profile_name
+        ).client('sts', **options))
+
+        def refresh():
+            try:
+                credentials = sts.assume_role(RoleArn=role_arn,
+                    RoleSessionName=self.ROLE_SESSION_NAME
+                )['Credentials']
+            except ClientError as e:
+                raise AwsConnectionException("Unable to assume role %s:\n %s" % \
+                    (role_arn, str(e),)
+                )
+            return {
+                "access_key": credentials['AccessKeyId'],
+                "secret_key": credentials['SecretAccessKey'],
+                "token": credentials['SessionToken'],
+                "expiry_time": credentials['Expiration'].isoformat(),
+            }
+
+        botocore_session = botocore.session.get_session()
+        botocore_session._credentials = \
+            RefreshableCredentials.create_from_metadata(
+                metadata=refresh(), refresh_using=refresh,
+                method='sts-assume-role'
+            )
+        return boto3.Session(botocore_session=botocore_session,
+            region_name=region
+        )
+
+    @staticmethod
+    def region_from_arn(arn):
+        """Get the region field of an aws arn."""
+        return SessionFactory._arn_field(arn, 3)
+
+    @staticmethod
+    def account_from_arn(arn):
+        """Get the account field of an aws arn."""
+        return SessionFactory._arn_field(arn, 4)
+
+    @staticmethod
+    def _arn_field(arn, index):
+        """Helper method to split a field out of an arn."""
+        fields = arn.split(':')
+        if len(fields) < 6 or fields[0] != 'arn':
+            raise AwsConnectionException("Malformed arn %s" % (arn,))
+        return fields[index] or None
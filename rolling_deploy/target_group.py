@@ -4,8 +4,10 @@ from rolling_deploy.exception import (
     AwsConnectionException
 )
 from rolling_deploy.ec2 import Ec2
+from rolling_deploy.progress import bus, ProgressEvent
+from rolling_deploy.session import client as aws_client
 from botocore.exceptions import ClientError
-from time import sleep
+from time import sleep, time
 import logging
 
 class ElbException(RollingDeployException):
@@ -18,12 +20,20 @@ class TargetGroup(object):
     HEALTH_UNHEALTHY = 'unhealthy'
     HEALTH_INITIAL = 'initial'
     HEALTH_DRAINING = 'draining'
+    HEALTH_UNUSED = 'unused'
+
+    REASON_NOT_REGISTERED = 'Target.NotRegistered'
+
+    ATTRIBUTE_DEREGISTRATION_DELAY = 'deregistration_delay.timeout_seconds'
+    DEFAULT_DEREGISTRATION_DELAY = 300
 
     WAIT_INTERVAL = 10 
     WAIT_LIMIT = 30
 
-    def __init__(self, TargetGroupArn=None):
-        self._client = self._get_client()
+    def __init__(self, TargetGroupArn=None, session=None):
+        self._session = session
+        self._client = self._get_client(session)
+        self._attributes = None
         self._load_target_group(TargetGroupArn)
 
     def _load_target_group(self, target_group_arn):
@@ -46,6 +56,90 @@ class TargetGroup(object):
             TargetGroupArn=self.arn()
             )['TargetHealthDescriptions']
 
+    def target_healths(self, instances):
+        """Get the raw target health of many instances, keyed by instance id,
+        with one api call covering only those instances.
+        """
+        try:
+            targets = self._client.describe_target_health(
+                TargetGroupArn=self.arn(),
+                Targets=[{"Id": instance.id()} for instance in instances]
+            )['TargetHealthDescriptions']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidTarget':
+                raise ElbException(
+                    "Unable to check health of instances %s:\n %s" % \
+                    (", ".join(instance.id() for instance in instances),
+                    str(e),)
+                )
+            # one of them is no longer a valid target, check them one by one
+            return dict((instance.id(), self.target_health(instance)) \
+                for instance in instances
+            )
+        return dict((target['Target']['Id'], target['TargetHealth']) \
+            for target in targets
+        )
+
+    def attributes(self):
+        """Get the attributes of this target group, loaded once and kept
+        current by the setters on this object.
+        """
+        if self._attributes is None:
+            try:
+                response = self._client.describe_target_group_attributes(
+                    TargetGroupArn=self.arn()
+                )
+            except ClientError as e:
+                raise ElbException(
+                    "Unable to load attributes of target group %s:\n %s" % \
+                    (self.arn(), str(e),)
+                )
+            self._attributes = dict((attribute['Key'], attribute['Value']) \
+                for attribute in response['Attributes']
+            )
+        return self._attributes
+
+    def deregistration_delay(self):
+        """Get the seconds a deregistered target is left draining."""
+        return int(self.attributes().get(self.ATTRIBUTE_DEREGISTRATION_DELAY,
+            self.DEFAULT_DEREGISTRATION_DELAY
+        ))
+
+    def set_deregistration_delay(self, seconds):
+        """Change the seconds a deregistered target is left draining."""
+        try:
+            self._client.modify_target_group_attributes(
+                TargetGroupArn=self.arn(), Attributes=({
+                    "Key": self.ATTRIBUTE_DEREGISTRATION_DELAY,
+                    "Value": str(seconds),
+                },)
+            )
+        except ClientError as e:
+            raise ElbException(
+                "Unable to set deregistration delay of target group %s:\n %s" \
+                % (self.arn(), str(e),)
+            )
+        self.attributes()[self.ATTRIBUTE_DEREGISTRATION_DELAY] = str(seconds)
+
+    def target_health(self, instance):
+        """Get the raw target health of a single instance, or None if the
+        instance is not registered with this target group.
+        """
+        try:
+            targets = self._client.describe_target_health(
+                TargetGroupArn=self.arn(), Targets=({"Id": instance.id()},)
+            )['TargetHealthDescriptions']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'InvalidTarget':
+                return None
+            raise ElbException("Unable to check health of instance %s:\n %s" % \
+                (instance.id(), str(e),)
+            )
+        if not targets or targets[0]['TargetHealth'].get('Reason') == \
+            self.REASON_NOT_REGISTERED:
+            return None
+        return targets[0]['TargetHealth']
+
     def arn(self):
         """Get the arn of this target group."""
         return self._tg_data['TargetGroupArn']
@@ -55,40 +149,78 @@ class TargetGroup(object):
         targets = self._get_target_health()
         return len(targets)
 
+    def instance_health(self):
+        """Get a snapshot of the instances attached to this target group as a
+        list of (Ec2, health state) pairs, loaded with one target health call
+        and batched instance describes.
+        """
+        targets = self._get_target_health()
+        instances = Ec2.load_instances(
+            [target['Target']['Id'] for target in targets], self._session
+        )
+        return [(instance, target['TargetHealth']['State']) for instance, target \
+            in zip(instances, targets)
+        ]
+
     def instances(self):
         """Get a list of Ec2 objects representing instances attached to this 
         target group.
         """
-        targets = self._get_target_health()
-        return [Ec2(InstanceId=instance['Target']['Id']) for instance in targets]
+        return [instance for instance, state in self.instance_health()]
 
     def healthy_instances(self):
         """Get a list of Ec2 objects represnting instances that are reporting
         a target group health check of healthy.
         """
-        targets = self._get_target_health()
-        return [Ec2(InstanceId=instance['Target']['Id']) for instance in \
-            targets if instance['TargetHealth']['State'] == self.HEALTH_HEALTHY
+        return [instance for instance, state in self.instance_health() \
+            if state == self.HEALTH_HEALTHY
             ]
 
     def is_healthy(self, instance):
         """Is the instance reporting healthy in this target group?"""
-        return instance.id() in [ec2.id() for ec2 in self.healthy_instances()]
+        health = self.target_health(instance)
+        return health is not None and health['State'] == self.HEALTH_HEALTHY
 
-    def wait_healthy(self, instance):
-        """Poll instance until it's passes target group health checks."""
-        poll = 0
-        while not self.is_healthy(instance) and poll < self.WAIT_LIMIT:
-            logging.info("Waiting for ec2 %s to report healthy." % \
-                (instance.id(),)
+    def wait_healthy(self, instance, timings=None):
+        """Poll instance until it's passes target group health checks. When a
+        TimingStore is passed, the first poll and the poll limit are tuned from
+        the health check times previously observed for this target group.
+        """
+        start = time()
+        limit = self.WAIT_LIMIT
+        key = {
+            "ami": instance.ami(),
+            "target_group": self.arn(),
+            "instance_type": instance.instance_type(),
+        }
+        if timings:
+            first_wait, limit = timings.schedule(timings.KIND_HEALTH,
+                self.WAIT_INTERVAL, limit, **key
             )
-            sleep(self.WAIT_INTERVAL)
-            poll += 1
+            sleep(first_wait)
+
+        poll = 0
+        last_miss = start
+        try:
+            while not self.is_healthy(instance) and poll < limit:
+                last_miss = time()
+                bus.waiting(ProgressEvent.KIND_HEALTHY, instance.id())
+                sleep(self.WAIT_INTERVAL)
+                poll += 1
+        finally:
+            bus.done_waiting(ProgressEvent.KIND_HEALTHY, instance.id())
 
-        if poll >= self.WAIT_LIMIT:
-            raise Ec2Exception("Instance %s took too long to pass health checks." \
+        if poll >= limit:
+            raise ElbException("Instance %s took too long to pass health checks." \
                 % (instance.id(),)
             )
+        if timings:
+            timings.record(timings.KIND_HEALTH,
+                timings.estimate(start, last_miss, time()), **key
+            )
+        bus.emit(ProgressEvent.KIND_HEALTHY, instance.id(),
+            target_group=self.arn()
+        )
         return True
 
     def add_instance(self, instance):
@@ -107,7 +239,7 @@ class TargetGroup(object):
 
     def remove_instance(self, instance):
         """Remove an instance from the target group."""
-        if instance.id() not in [ec2.id() for ec2 in self.instances()]:
+        if self.target_health(instance) is None:
             raise ElbException('Unable to remove %s from target group.' % \
                 (instance.id(),)
             )
@@ -122,20 +254,26 @@ class TargetGroup(object):
                 (instance.id(), str(e))
             )
 
+    def session(self):
+        """The boto3 session this target group was loaded with, or None for
+        the default session.
+        """
+        return self._session
+
     @staticmethod
-    def _get_client():
+    def _get_client(session=None):
         """Helper method to get the boto3 elbv2 client."""
-        return boto3.client('elbv2')
+        return aws_client('elbv2', session)
 
     @classmethod
-    def from_load_balancer(cls, lb_arn):
+    def from_load_balancer(cls, lb_arn, session=None):
         """Get the first target group attached to a load balancer."""
-        client = boto3.client('elbv2')
+        client = cls._get_client(session)
         try:
             response = client.describe_target_groups(LoadBalancerArn=lb_arn)
             return cls(TargetGroupArn=
-                response['TargetGroups'][0]['TargetGroupArn']
+                response['TargetGroups'][0]['TargetGroupArn'], session=session
             )
         except (ClientError, IndexError) as e:
-            raise TargetGroupError("Unable to find target groups attached to %s"\
+            raise ElbException("Unable to find target groups attached to %s"\
                 % (lb_arn,))
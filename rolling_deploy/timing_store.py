@@ -0,0 +1,120 @@
+import json
+import math
+import os
+from threading import Lock
+from time import time
+from rolling_deploy.exception import RollingDeployException
+
+class TimingStoreException(RollingDeployException):
+    """Timing Store Logic Exception."""
+
+class TimingStore(object):
+    """A local json-lines store of observed boot, health and drain times,
+    used to tune how long waiters sleep before polling and how long they
+    wait before giving up.
+    """
+
+    KIND_BOOT = 'boot'
+    KIND_HEALTH = 'health'
+    KIND_DRAIN = 'drain'
+
+    KEY_FIELDS = ('ami', 'target_group', 'instance_type')
+
+    MIN_SAMPLES = 5
+    HISTORY_LIMIT = 100
+    FIRST_POLL_PERCENTILE = 50
+    DEADLINE_PERCENTILE = 99
+    DEADLINE_FACTOR = 2
+
+    def __init__(self, path):
+        self._path = path
+        self._records = []
+        self._lock = Lock()
+        self._load()
+
+    def _load(self):
+        """Helper method to read all previously recorded timings."""
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path) as handle:
+                for line in handle:
+                    line = line.strip()
+                    if line:
+                        self._records.append(json.loads(line))
+        except (IOError, ValueError) as e:
+            raise TimingStoreException("Unable to read timing store %s:\n %s" % \
+                (self._path, str(e),)
+            )
+
+    def record(self, kind, seconds, ami=None, target_group=None,
+        instance_type=None):
+        """Record an observed duration for a kind of state change."""
+        entry = {
+            "kind": kind,
+            "seconds": seconds,
+            "ami": ami,
+            "target_group": target_group,
+            "instance_type": instance_type,
+            "recorded": time(),
+        }
+        with self._lock:
+            try:
+                with open(self._path, 'a') as handle:
+                    handle.write(json.dumps(entry) + "\n")
+            except IOError as e:
+                raise TimingStoreException(
+                    "Unable to write timing store %s:\n %s" % \
+                    (self._path, str(e),)
+                )
+            self._records.append(entry)
+
+    def observations(self, kind, **key):
+        """Get the most recent durations recorded for a kind of state change,
+        matching every key field that is passed.
+        """
+        key = dict((field, value) for field, value in key.items() \
+            if field in self.KEY_FIELDS and value is not None
+        )
+        seconds = [entry['seconds'] for entry in self._records \
+            if entry['kind'] == kind and \
+            all(entry.get(field) == value for field, value in key.items())
+        ]
+        return seconds[-self.HISTORY_LIMIT:]
+
+    def percentile(self, kind, percent, **key):
+        """Nearest rank percentile of the matching observations, or None when
+        there is not enough history to trust.
+        """
+        seconds = sorted(self.observations(kind, **key))
+        if len(seconds) < self.MIN_SAMPLES:
+            return None
+        rank = int(math.ceil(percent / 100.0 * len(seconds)))
+        return seconds[max(rank, 1) - 1]
+
+    def schedule(self, kind, interval, limit, **key):
+        """Get the (first_wait, limit) a waiter polling every interval seconds
+        should use. Without enough history the waiter polls right away and
+        keeps its default limit. History only ever extends the limit, since a
+        wait that times out is never recorded and could not correct a limit
+        that was cut too short.
+        """
+        first_wait = self.percentile(kind, self.FIRST_POLL_PERCENTILE, **key)
+        deadline = self.percentile(kind, self.DEADLINE_PERCENTILE, **key)
+        if first_wait is None or deadline is None:
+            return 0, limit
+
+        remaining = deadline * self.DEADLINE_FACTOR - first_wait
+        if interval <= 0:
+            return first_wait, limit
+        return first_wait, max(int(math.ceil(remaining / interval)), limit)
+
+    @staticmethod
+    def estimate(start, last_miss, detected):
+        """Estimate how long a state change took from when a wait started,
+        the last poll that missed the change and the poll that saw it. The
+        change happened between the two polls, so the midpoint is used
+        rather than the detection time, which would only ever grow with the
+        first wait it was used to tune.
+        """
+        return max((last_miss + detected) / 2.0 - start, 0)
@@ -0,0 +1,157 @@
+"""Load tests running Deployer.deploy against a standalone moto server at
+fleet scale. They are slow, so they are not picked up by test discovery:
+
+    python -m unittest tests.loadDeployer
+
+LOAD_TEST_SIZES picks the fleet sizes to run (default 100,500,2000) and
+LOAD_TEST_UPDATE=1 records the results as the new baselines.
+"""
+import json
+import os
+import sys
+import tracemalloc
+import unittest
+from time import time
+from rolling_deploy.deployer import Deployer
+from rolling_deploy.target_group import TargetGroup
+from rolling_deploy.ec2 import Ec2
+from rolling_deploy.progress import bus
+from tests.moto_server import MotoServerHelper
+
+class DeployerLoadTest(unittest.TestCase):
+    """Deployer api call, memory and time budgets at fleet scale."""
+
+    BASELINES = os.path.join(os.path.dirname(__file__), 'load_baselines.json')
+    SIZES = (100, 500, 2000)
+    REGISTER_BATCH = 100
+
+    CALL_TOLERANCE = 1.1
+    MEMORY_TOLERANCE = 1.5
+    TIME_TOLERANCE = 2.0
+
+    @classmethod
+    def setUpClass(self):
+        """Start the moto server and shrink the wait constants."""
+        self._server = MotoServerHelper()
+        self._server.start()
+        self._ec2 = self._server.client('ec2')
+        self._elb = self._server.client('elbv2')
+        self._wait_intervals = (Ec2.WAIT_INTERVAL, TargetGroup.WAIT_INTERVAL)
+        Ec2.WAIT_INTERVAL = 0
+        TargetGroup.WAIT_INTERVAL = 0
+
+        self._baselines = {}
+        if os.path.exists(self.BASELINES):
+            with open(self.BASELINES) as handle:
+                self._baselines = json.load(handle)
+        self._results = {}
+
+    @classmethod
+    def tearDownClass(self):
+        Ec2.WAIT_INTERVAL, TargetGroup.WAIT_INTERVAL = self._wait_intervals
+        self._server.stop()
+        if os.environ.get('LOAD_TEST_UPDATE'):
+            self._baselines.update(self._results)
+            with open(self.BASELINES, 'w') as handle:
+                json.dump(self._baselines, handle, indent=4, sort_keys=True)
+                handle.write("\n")
+
+    def _sizes(self):
+        if os.environ.get('LOAD_TEST_SIZES'):
+            return [int(size) for size in
+                os.environ['LOAD_TEST_SIZES'].split(',')
+            ]
+        return self.SIZES
+
+    def _seed(self, size):
+        """Create a target group of size healthy instances spread over the
+        default subnets, returning its arn and the old and new amis.
+        """
+        images = [image['ImageId'] for image in
+            self._ec2.describe_images()['Images']
+        ]
+        vpc = self._ec2.describe_vpcs(
+            Filters=[{"Name": "isDefault", "Values": ["true"]}]
+        )['Vpcs'][0]['VpcId']
+        subnets = [subnet['SubnetId'] for subnet in self._ec2.describe_subnets(
+            Filters=[{"Name": "vpc-id", "Values": [vpc]}])['Subnets']
+        ]
+
+        instance_ids = []
+        for index, subnet in enumerate(subnets):
+            count = size // len(subnets) + \
+                (1 if index < size % len(subnets) else 0)
+            if count:
+                instance_ids += [instance['InstanceId'] for instance in
+                    self._ec2.run_instances(ImageId=images[0], MinCount=count,
+                        MaxCount=count, SubnetId=subnet)['Instances']
+                ]
+
+        arn = self._elb.create_target_group(Name="Load%d" % (size,),
+            Protocol='HTTP', Port=80, VpcId=vpc
+        )['TargetGroups'][0]['TargetGroupArn']
+        for start in range(0, len(instance_ids), self.REGISTER_BATCH):
+            self._elb.register_targets(TargetGroupArn=arn, Targets=[
+                {"Id": instance_id} for instance_id in
+                instance_ids[start:start + self.REGISTER_BATCH]
+            ])
+        return arn, images[0], images[2]
+
+    def _measure(self, size):
+        """Deploy a seeded target group, returning its calls per operation,
+        peak python memory and wall clock time.
+        """
+        arn, old_ami, new_ami = self._seed(size)
+        calls_before = bus.counts()[0]
+
+        tracemalloc.start()
+        start = time()
+        Deployer(TargetGroup(arn)).deploy(old_ami, new_ami)
+        seconds = time() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        calls = dict((operation, count - calls_before.get(operation, 0)) \
+            for operation, count in bus.counts()[0].items() \
+            if count > calls_before.get(operation, 0)
+        )
+        return {
+            "calls": calls,
+            "peak_memory": peak_memory,
+            "seconds": round(seconds, 2),
+        }
+
+    def _check(self, size, result):
+        """Compare a result with the stored baseline for its size."""
+        baseline = self._baselines.get(str(size))
+        if baseline is None:
+            return
+        for operation, count in sorted(result['calls'].items()):
+            self.assertLessEqual(count,
+                baseline['calls'].get(operation, 0) * self.CALL_TOLERANCE,
+                "%d instances: %s made %d calls" % (size, operation, count)
+            )
+        self.assertLessEqual(result['peak_memory'],
+            baseline['peak_memory'] * self.MEMORY_TOLERANCE,
+            "%d instances: peak memory %d bytes" % \
+                (size, result['peak_memory'])
+        )
+        self.assertLessEqual(result['seconds'],
+            baseline['seconds'] * self.TIME_TOLERANCE,
+            "%d instances: deploy took %.2f seconds" % \
+                (size, result['seconds'])
+        )
+
+    def test_deploy_within_baselines(self):
+        """Deploys should stay within their api call, memory and time
+        baselines at every fleet size.
+        """
+        for size in self._sizes():
+            result = self._measure(size)
+            self._results[str(size)] = result
+            sys.stderr.write("\n%d instances: %d calls, %.1f MiB peak, "
+                "%.2f seconds\n" % (size, sum(result['calls'].values()),
+                result['peak_memory'] / 1048576.0, result['seconds'],)
+            )
+            with self.subTest(size=size):
+                self._check(size, result)
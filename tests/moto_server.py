@@ -0,0 +1,63 @@
+import os
+import socket
+import subprocess
+import sys
+from time import sleep
+import boto3
+
+class MotoServerHelper(object):
+    """Runs a standalone moto server in a subprocess and points boto3
+    clients at it through AWS_ENDPOINT_URL.
+    """
+
+    START_TIMEOUT = 30
+
+    def __init__(self, port=None):
+        self._port = port or self._free_port()
+        self._process = None
+        self._previous_endpoint = None
+
+    def endpoint(self):
+        return "http://127.0.0.1:%d" % (self._port,)
+
+    def client(self, service):
+        return boto3.client(service, endpoint_url=self.endpoint())
+
+    def start(self):
+        """Start the server and wait until it accepts connections."""
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'moto.server', '-p', str(self._port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for attempt in range(self.START_TIMEOUT * 10):
+            try:
+                socket.create_connection(('127.0.0.1', self._port), 1).close()
+                break
+            except socket.error:
+                sleep(0.1)
+        else:
+            self.stop()
+            raise RuntimeError("moto server did not start on port %d" % \
+                (self._port,)
+            )
+        self._previous_endpoint = os.environ.get('AWS_ENDPOINT_URL')
+        os.environ['AWS_ENDPOINT_URL'] = self.endpoint()
+
+    def stop(self):
+        """Stop the server and restore the endpoint setting."""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
+        if self._previous_endpoint is None:
+            os.environ.pop('AWS_ENDPOINT_URL', None)
+        else:
+            os.environ['AWS_ENDPOINT_URL'] = self._previous_endpoint
+
+    @staticmethod
+    def _free_port():
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        return port
@@ -2,9 +2,43 @@ import unittest
 from rolling_deploy.deployer import Deployer, DeployerException
 from rolling_deploy.target_group import TargetGroup
 from rolling_deploy.ec2 import Ec2
+from rolling_deploy.scheduler import SchedulerException
 from tests.target_group_mock import MockTargetGroupHelper
 from tests.ec2_mock import MockEc2Helper
 from moto import mock_ec2, mock_elbv2
+from time import time
+
+class StubInstance(object):
+    """An instance stand-in for deployer tests without api calls."""
+
+    def id(self):
+        return 'i-draining'
+
+class DrainingTargetGroup(object):
+    """A target group stand-in whose only target is draining for drain_for
+    seconds after it was created.
+    """
+
+    HEALTH_DRAINING = TargetGroup.HEALTH_DRAINING
+    HEALTH_UNUSED = TargetGroup.HEALTH_UNUSED
+
+    def __init__(self, delay, drain_for):
+        self.instance = StubInstance()
+        self.deregistered = time()
+        self._delay = delay
+        self._drain_for = drain_for
+
+    def arn(self):
+        return 'arn:aws:elasticloadbalancing:us-east-1:123456789012:' \
+            'targetgroup/draining/1234'
+
+    def deregistration_delay(self):
+        return self._delay
+
+    def target_health(self, instance):
+        if time() - self.deregistered < self._drain_for:
+            return {"State": self.HEALTH_DRAINING}
+        return {"State": self.HEALTH_UNUSED}
 
 @mock_ec2
 @mock_elbv2
@@ -84,6 +118,59 @@ class TargetGroupTest(unittest.TestCase):
         )
 
 
+    def test_wait_drained_removed_instance(self):
+        """An instance removed from the target group should be drained."""
+        deployer = Deployer(self._target_group)
+        instance = Ec2(self._ec2_mock.instances()[0]['InstanceId'])
+
+        deployer._roll_out(instance)
+        self.assertTrue(deployer.wait_drained(instance, wait_interval=0))
+
+    def test_drained_after_deregistration_delay(self):
+        """An instance draining for the full deregistration delay should be
+        safe to terminate.
+        """
+        deployer = Deployer(self._target_group)
+        instance = Ec2(self._ec2_mock.instances()[0]['InstanceId'])
+        draining = {"State": TargetGroup.HEALTH_DRAINING}
+
+        self.assertFalse(deployer._drained(instance, draining))
+
+        self._target_group.set_deregistration_delay(0)
+        deployer._roll_out(instance)
+        self.assertTrue(deployer._drained(instance, draining))
+
+    def test_wait_drained_within_deregistration_delay(self):
+        """An instance draining for longer than the fallback poll limit but
+        within the deregistration delay should be waited on.
+        """
+        target_group = DrainingTargetGroup(delay=0.5, drain_for=0.3)
+        deployer = Deployer(target_group)
+        deployer.WAIT_TIMEOUT = 2
+        instance = target_group.instance
+        deployer._deregistered[instance.id()] = target_group.deregistered
+
+        self.assertTrue(deployer.wait_drained(instance, wait_interval=0.05))
+        self.assertGreaterEqual(time() - target_group.deregistered, 0.3)
+
+    def test_release_drained(self):
+        """Removed instances should be terminated once drained, while
+        instances still in the group are kept.
+        """
+        deployer = Deployer(self._target_group)
+        removed = Ec2(self._ec2_mock.instances()[0]['InstanceId'])
+        registered = Ec2(self._ec2_mock.instances()[1]['InstanceId'])
+
+        deployer._roll_out(removed)
+        draining = deployer._release_drained([removed, registered])
+
+        self.assertEqual([instance.id() for instance in draining],
+            [registered.id()]
+        )
+        self.assertIn(removed.state(),
+            (Ec2.STATE_SHUTTING_DOWN, Ec2.STATE_TERMINATED,)
+        )
+
     def test_clean_up_healthy_instance_fails(self):
         """Attempting to terminate a healthy instance should throw an 
         exception.
@@ -123,3 +210,57 @@ class TargetGroupTest(unittest.TestCase):
         self.assertEqual(len(self._ec2_mock.instances()), \
             self._ec2_mock.INSTANCE_COUNT
         )
+
+    def test_deploy_without_old_instances(self):
+        """A deploy from an ami no instance runs should change nothing."""
+        deployer = Deployer(self._target_group, drain_delay=0)
+        instances = self._target_group.instances()
+        deployer.deploy(self._new_ami, self._ec2_mock.default_image())
+
+        self.assertEqual(
+            set([ec2.id() for ec2 in self._target_group.healthy_instances()]),
+            set([ec2.id() for ec2 in instances])
+        )
+        self.assertEqual(len(self._ec2_mock.instances()), \
+            self._ec2_mock.INSTANCE_COUNT
+        )
+
+    def test_deploy_bad_ami(self):
+        """Deploying an ami that doesn't exist should fail before any
+        instance is replaced.
+        """
+        deployer = Deployer(self._target_group)
+        with self.assertRaises(DeployerException):
+            deployer.deploy(self._ec2_mock.default_image(), 'ami-phonyid')
+
+        self.assertEqual(len(self._ec2_mock.instances()), \
+            self._ec2_mock.INSTANCE_COUNT
+        )
+
+    def test_deploy_unreachable_floor(self):
+        """A deploy that can't keep az_floor should fail before launching
+        any instance or changing the deregistration delay.
+        """
+        deployer = Deployer(self._target_group, drain_delay=0,
+            az_floor=self._ec2_mock.INSTANCE_COUNT + 1
+        )
+        with self.assertRaises(SchedulerException):
+            deployer.deploy(self._ec2_mock.default_image(), self._new_ami)
+
+        self.assertEqual(len(self._ec2_mock.instances()), \
+            self._ec2_mock.INSTANCE_COUNT
+        )
+        self.assertEqual(
+            TargetGroup(self._target_group.arn()).deregistration_delay(),
+            TargetGroup.DEFAULT_DEREGISTRATION_DELAY
+        )
+
+    def test_deploy_restores_deregistration_delay(self):
+        """A shortened drain delay should only apply during the deploy."""
+        deployer = Deployer(self._target_group, drain_delay=0)
+        deployer.deploy(self._ec2_mock.default_image(), self._new_ami)
+
+        target_group = TargetGroup(self._target_group.arn())
+        self.assertEqual(target_group.deregistration_delay(),
+            TargetGroup.DEFAULT_DEREGISTRATION_DELAY
+        )
@@ -1,6 +1,11 @@
 import unittest
+import os
+import tempfile
 import boto3
+from time import time
 from rolling_deploy.ec2 import Ec2, Ec2Exception
+from rolling_deploy.timing_store import TimingStore
+from rolling_deploy.events import InstanceEventSource
 from tests.ec2_mock import MockEc2Helper
 from moto import mock_ec2
 
@@ -60,6 +65,33 @@ class Ec2Test(unittest.TestCase):
         # there should only be one new instance
         self.assertEqual(len(self._ec2_mock.instances()), self.INSTANCE_COUNT + 1)
 
+    def test_create_instance_in_zone(self):
+        """Creating an instance in an availability zone should place it
+        there.
+        """
+        zone = self._client.describe_availability_zones(
+            )['AvailabilityZones'][1]['ZoneName']
+        instance = Ec2.create_instance(self._ec2_mock.default_image(),
+            availability_zone=zone
+        )
+        self.assertEqual(instance.availability_zone(), zone)
+
+    def test_load_instances(self):
+        """Loading many instances should return them in the order asked."""
+        instance_ids = [instance['InstanceId'] for instance in \
+            self._ec2_mock.instances()
+        ]
+        instance_ids.reverse()
+        instances = Ec2.load_instances(instance_ids)
+        self.assertEqual([instance.id() for instance in instances],
+            instance_ids
+        )
+
+    def test_load_instances_bad_id(self):
+        """Loading a non-existant instance should cause an error."""
+        with self.assertRaises(Ec2Exception):
+            Ec2.load_instances(['i-1234567890abcdef0'])
+
     def test_create_instance_bad_ami(self):
         """Creating an instance with an improper ami id should fail."""
         with self.assertRaises(Ec2Exception):
@@ -114,3 +146,58 @@ class Ec2Test(unittest.TestCase):
         self.assertTrue(ec2.wait_ready())
         # TODO test wait timeout????
 
+    def test_wait_ready_records_boot_time(self):
+        """Waiting with a timing store should record the observed boot time."""
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            timings = TimingStore(path)
+            ec2 = Ec2.create_instance(self._ec2_mock.default_image())
+            self.assertTrue(ec2.wait_ready(timings))
+            self.assertEqual(len(timings.observations(TimingStore.KIND_BOOT,
+                ami=ec2.ami(), instance_type=ec2.instance_type())), 1
+            )
+        finally:
+            os.remove(path)
+
+    def test_wait_ready_with_events(self):
+        """Waiting with an event source should return once the instance is
+        notified running.
+        """
+        ec2 = Ec2.create_instance(self._ec2_mock.default_image())
+        events = InstanceEventSource()
+        events.publish(ec2.id(), Ec2.STATE_RUNNING)
+        self.assertTrue(ec2.wait_ready(events=events))
+
+    def test_wait_ready_with_lagging_describe(self):
+        """A running notification that describe_instances hasn't caught up
+        with should be followed by normal polling, not a burst of checks.
+        """
+        ec2 = Ec2.create_instance(self._ec2_mock.default_image())
+        ec2.WAIT_INTERVAL = 0.01
+        ec2.WAIT_LIMIT = 100
+        checks = []
+        ec2.ready = lambda: checks.append(1) or len(checks) > 10
+        events = InstanceEventSource()
+        events.publish(ec2.id(), Ec2.STATE_RUNNING)
+
+        start = time()
+        self.assertTrue(ec2.wait_ready(events=events))
+        self.assertEqual(len(checks), 11)
+        self.assertGreaterEqual(time() - start, 9 * ec2.WAIT_INTERVAL)
+
+    def test_wait_ready_timeout_by_elapsed_time(self):
+        """Waiting should only give up once the wait limit has elapsed."""
+        ec2 = Ec2.create_instance(self._ec2_mock.default_image())
+        ec2.WAIT_INTERVAL = 0.01
+        ec2.WAIT_LIMIT = 10
+        ec2.ready = lambda: False
+        events = InstanceEventSource()
+        events.publish(ec2.id(), Ec2.STATE_RUNNING)
+
+        start = time()
+        with self.assertRaises(Ec2Exception):
+            ec2.wait_ready(events=events)
+        self.assertGreaterEqual(time() - start,
+            ec2.WAIT_LIMIT * ec2.WAIT_INTERVAL
+        )
@@ -0,0 +1,115 @@
+import unittest
+import json
+import boto3
+from threading import Timer
+from time import sleep
+from botocore.exceptions import EndpointConnectionError
+from rolling_deploy.events import (
+    InstanceEventSource,
+    QueueEventSource,
+    EventSourceException
+)
+from moto import mock_sqs
+
+class InstanceEventSourceTest(unittest.TestCase):
+    """In-memory Event Source Tests."""
+
+    def test_wait_returns_published_state(self):
+        """A state published before waiting should be seen right away."""
+        events = InstanceEventSource()
+        events.publish('i-1234', 'running')
+        self.assertTrue(events.wait('i-1234', ('running',), 0))
+        self.assertEqual(events.state('i-1234'), 'running')
+
+    def test_wait_wakes_on_publish(self):
+        """A waiter should wake as soon as its state is published."""
+        events = InstanceEventSource()
+        Timer(0.05, events.publish, ('i-1234', 'running')).start()
+        self.assertTrue(events.wait('i-1234', ('running',), 5))
+
+    def test_wait_times_out(self):
+        """A waiter should give up when no matching state is published."""
+        events = InstanceEventSource()
+        events.publish('i-1234', 'pending')
+        events.publish('i-5678', 'running')
+        self.assertFalse(events.wait('i-1234', ('running',), 0.05))
+
+class UnreachableClient(object):
+    """An sqs client stand-in that can't connect."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def receive_message(self, **kwargs):
+        self.calls += 1
+        raise EndpointConnectionError(endpoint_url='https://sqs.invalid')
+
+@mock_sqs
+class QueueEventSourceTest(unittest.TestCase):
+    """Sqs Queue Event Source Tests."""
+
+    def setUp(self):
+        self._client = boto3.client('sqs', region_name='us-east-1')
+        self._queue_url = self._client.create_queue(
+            QueueName='instance-events'
+        )['QueueUrl']
+
+    def _notification(self, instance_id, state):
+        return json.dumps({
+            "detail-type": QueueEventSource.DETAIL_TYPE,
+            "source": "aws.ec2",
+            "detail": {"instance-id": instance_id, "state": state},
+        })
+
+    def test_receive_publishes_state_changes(self):
+        """State change notifications on the queue should be published."""
+        self._client.send_message(QueueUrl=self._queue_url,
+            MessageBody=self._notification('i-1234', 'running')
+        )
+        self._client.send_message(QueueUrl=self._queue_url,
+            MessageBody=json.dumps({"Message":
+                self._notification('i-5678', 'pending')
+            })
+        )
+        self._client.send_message(QueueUrl=self._queue_url,
+            MessageBody='not an event'
+        )
+
+        events = QueueEventSource(self._queue_url)
+        self.assertEqual(events.receive(wait_seconds=0), 2)
+        self.assertEqual(events.state('i-1234'), 'running')
+        self.assertEqual(events.state('i-5678'), 'pending')
+
+        # received messages are removed from the queue
+        self.assertEqual(events.receive(wait_seconds=0), 0)
+
+    def test_receive_connection_error(self):
+        """Connection errors should be raised as event source errors and
+        keep the receive thread running.
+        """
+        source = QueueEventSource(self._queue_url)
+        source._client = UnreachableClient()
+        source.RECEIVE_WAIT = 0.01
+        with self.assertRaises(EventSourceException):
+            source.receive()
+
+        source.start()
+        sleep(0.1)
+        self.assertTrue(source._thread.is_alive())
+        source.stop()
+        self.assertGreater(source._client.calls, 2)
+
+    def test_region_from_url(self):
+        """The region should be read from either queue url format."""
+        self.assertEqual(QueueEventSource.region_from_url(
+            'https://sqs.eu-west-1.amazonaws.com/123456789012/events'),
+            'eu-west-1'
+        )
+        self.assertEqual(QueueEventSource.region_from_url(
+            'https://eu-west-1.queue.amazonaws.com/123456789012/events'),
+            'eu-west-1'
+        )
+        self.assertEqual(QueueEventSource.account_from_url(
+            'https://sqs.eu-west-1.amazonaws.com/123456789012/events'),
+            '123456789012'
+        )
@@ -0,0 +1,96 @@
+import unittest
+from rolling_deploy.fleet import FleetDeployer, FleetException
+from rolling_deploy.target_group import TargetGroup
+from rolling_deploy.ec2 import Ec2
+from tests.target_group_mock import MockTargetGroupHelper
+from tests.ec2_mock import MockEc2Helper
+from moto import mock_ec2, mock_elbv2
+
+@mock_ec2
+@mock_elbv2
+class FleetDeployerTest(unittest.TestCase):
+    """Fleet Deployer Tests."""
+
+    @classmethod
+    def setUpClass(self):
+        """Init class test objects."""
+        self._target_group_mock = MockTargetGroupHelper()
+        self._ec2_mock = MockEc2Helper()
+        self._new_ami = self._ec2_mock.images()[2]
+
+    def setUp(self):
+        self._target_group_mock.setUp()
+        self._arn = self._target_group_mock.target_group()['TargetGroupArn']
+
+    def tearDown(self):
+        self._target_group_mock.tearDown()
+
+    def test_target_groups_grouped_by_region_and_account(self):
+        """Target groups should be queued per region and account."""
+        fleet = FleetDeployer()
+        fleet.add_target_group(
+            'arn:aws:elasticloadbalancing:eu-west-1:111111111111:targetgroup/a/1',
+            'ami-old', 'ami-new'
+        )
+        fleet.add_target_group(
+            'arn:aws:elasticloadbalancing:eu-west-1:111111111111:targetgroup/b/2',
+            'ami-old', 'ami-new'
+        )
+        fleet.add_target_group(
+            'arn:aws:elasticloadbalancing:us-west-2:222222222222:targetgroup/c/3',
+            'ami-old', 'ami-new'
+        )
+
+        self.assertEqual(set(fleet._jobs.keys()), set((
+            ('eu-west-1', '111111111111'), ('us-west-2', '222222222222'),
+        )))
+        self.assertEqual(len(fleet._jobs[('eu-west-1', '111111111111')]), 2)
+
+    def test_deploy(self):
+        """Every queued target group should be deployed."""
+        fleet = FleetDeployer()
+        fleet.add_target_group(self._arn, self._ec2_mock.default_image(),
+            self._new_ami
+        )
+
+        self.assertEqual(fleet.deploy(), {self._arn: None})
+        self.assertEqual(set((self._new_ami,)), set([ec2.ami() for ec2 in
+            TargetGroup(self._arn).healthy_instances()
+        ]))
+
+    def test_unexpected_error_keeps_other_results(self):
+        """An error outside this package in one region should be reported
+        without stopping the other regions.
+        """
+        broken_arn = ('arn:aws:elasticloadbalancing:eu-west-1:123456789012:'
+            'targetgroup/Broken/1')
+
+        class BrokenRegionSessions(object):
+            def get_session(self, region, role_arn=None):
+                if region == 'eu-west-1':
+                    raise RuntimeError('AccessDenied')
+                return None
+
+        fleet = FleetDeployer(sessions=BrokenRegionSessions())
+        fleet.add_target_group(self._arn, self._ec2_mock.default_image(),
+            self._new_ami
+        )
+        fleet.add_target_group(broken_arn, 'ami-old', 'ami-new')
+
+        with self.assertRaises(FleetException) as context:
+            fleet.deploy()
+        self.assertIn(broken_arn, str(context.exception))
+        self.assertNotIn(self._arn, str(context.exception))
+        self.assertEqual(set((self._new_ami,)), set([ec2.ami() for ec2 in
+            TargetGroup(self._arn).healthy_instances()
+        ]))
+
+    def test_failed_deploy_raises(self):
+        """A failing target group should be reported once all have run."""
+        fleet = FleetDeployer()
+        fleet.add_target_group(self._arn, self._ec2_mock.default_image(),
+            'ami-phonyid'
+        )
+
+        with self.assertRaises(FleetException):
+            fleet.deploy()
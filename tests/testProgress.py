@@ -0,0 +1,149 @@
+import unittest
+import io
+import json
+import boto3
+from botocore.awsrequest import AWSResponse
+from rolling_deploy.progress import (
+    ProgressBus,
+    ProgressEvent,
+    JsonLinesSink,
+    TerminalSink
+)
+from moto import mock_ec2
+
+class ProgressBusTest(unittest.TestCase):
+    """Progress Bus Tests."""
+
+    def setUp(self):
+        self._bus = ProgressBus()
+        self._events = []
+        self._bus.subscribe(self._events.append)
+
+    def test_emit_sends_event(self):
+        """Lifecycle events should be sent to sinks straight away."""
+        self._bus.emit(ProgressEvent.KIND_LAUNCHED, 'i-1234', ami='ami-1234')
+
+        self.assertEqual(len(self._events), 1)
+        self.assertEqual(self._events[0].kind, ProgressEvent.KIND_LAUNCHED)
+        self.assertEqual(self._events[0].instance_id, 'i-1234')
+        self.assertEqual(self._events[0].detail, {"ami": 'ami-1234'})
+
+    def test_waiting_is_coalesced(self):
+        """Repeated waits should be sent as a single waiting event."""
+        for poll in range(10):
+            self._bus.waiting(ProgressEvent.KIND_READY, 'i-1234')
+            self._bus.waiting(ProgressEvent.KIND_READY, 'i-5678')
+        self._bus.done_waiting(ProgressEvent.KIND_READY, 'i-5678')
+        self.assertEqual(self._events, [])
+
+        self._bus.flush()
+        self.assertEqual(len(self._events), 1)
+        self.assertEqual(self._events[0].detail,
+            {ProgressEvent.KIND_READY: ['i-1234']}
+        )
+
+    def test_waiting_flushes_on_interval(self):
+        """Waits should be sent once the flush interval has passed."""
+        self._bus.FLUSH_INTERVAL = 0
+        self._bus.waiting(ProgressEvent.KIND_HEALTHY, 'i-1234')
+        self.assertEqual([event.kind for event in self._events],
+            [ProgressEvent.KIND_WAITING]
+        )
+
+    def test_count_calls_and_throttles(self):
+        """Api calls and throttled calls should be counted per operation."""
+        self._bus.count_call('DescribeInstances')
+        self._bus.count_call('DescribeInstances', 'RequestLimitExceeded')
+        self._bus.count_call('RunInstances', 'InvalidAMIID.NotFound')
+        self._bus.flush()
+
+        self.assertEqual(self._events[0].kind, ProgressEvent.KIND_API_CALLS)
+        self.assertEqual(self._events[0].detail, {
+            "calls": {"DescribeInstances": 2, "RunInstances": 1},
+            "throttles": {"DescribeInstances": 1},
+        })
+
+    def test_counts(self):
+        """Counts should be readable without flushing."""
+        self._bus.count_call('DescribeInstances', 'Throttling')
+        self.assertEqual(self._bus.counts(),
+            ({"DescribeInstances": 1}, {"DescribeInstances": 1})
+        )
+        self.assertEqual(self._events, [])
+
+    @mock_ec2
+    def test_instrument_client(self):
+        """Calls made by an instrumented client should be counted."""
+        client = self._bus.instrument(boto3.client('ec2'))
+        client.describe_instances()
+        client.describe_instances()
+        self._bus.flush()
+
+        self.assertEqual(self._events[0].detail['calls'],
+            {"DescribeInstances": 2}
+        )
+
+    def test_instrument_counts_retried_throttles(self):
+        """Throttled attempts botocore retried should each be counted."""
+        client = self._bus.instrument(boto3.client('ec2',
+            region_name='us-east-1', aws_access_key_id='testing',
+            aws_secret_access_key='testing'
+        ))
+        throttled = b'<Response><Errors><Error>' \
+            b'<Code>RequestLimitExceeded</Code><Message>Slow down</Message>' \
+            b'</Error></Errors><RequestID>1</RequestID></Response>'
+        ok = b'<DescribeInstancesResponse><reservationSet/>' \
+            b'</DescribeInstancesResponse>'
+        bodies = [(503, throttled), (503, throttled), (200, ok)]
+
+        def send(request, **kwargs):
+            status, body = bodies.pop(0)
+            return AWSResponse(request.url, status, {}, StubRawResponse(body))
+        client.meta.events.register('before-send', send)
+        client.describe_instances()
+
+        self.assertEqual(self._bus.counts(), (
+            {"DescribeInstances": 3},
+            {"DescribeInstances": 2},
+        ))
+
+class StubRawResponse(object):
+    """A raw http response body for AWSResponse."""
+
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+class ProgressSinkTest(unittest.TestCase):
+    """Progress Sink Tests."""
+
+    def test_json_lines_sink(self):
+        """Each event should be written as a line of json."""
+        stream = io.StringIO()
+        bus = ProgressBus()
+        bus.subscribe(JsonLinesSink(stream))
+        bus.emit(ProgressEvent.KIND_READY, 'i-1234')
+        bus.emit(ProgressEvent.KIND_TERMINATED, 'i-5678')
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line['kind'] for line in lines],
+            [ProgressEvent.KIND_READY, ProgressEvent.KIND_TERMINATED]
+        )
+        self.assertEqual(lines[0]['instance_id'], 'i-1234')
+
+    def test_terminal_sink(self):
+        """The terminal view should count events on one status line."""
+        stream = io.StringIO()
+        sink = TerminalSink(stream)
+        bus = ProgressBus()
+        bus.subscribe(sink)
+        bus.emit(ProgressEvent.KIND_LAUNCHED, 'i-1234')
+        bus.emit(ProgressEvent.KIND_WAVE_COMPLETE, wave=1, waves=3)
+        sink.close()
+
+        output = stream.getvalue()
+        self.assertIn("wave 1/3 complete\n", output)
+        self.assertIn("launched 1", output)
+        self.assertTrue(output.endswith("\n"))
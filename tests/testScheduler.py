@@ -0,0 +1,103 @@
+import unittest
+from rolling_deploy.scheduler import AzScheduler, SchedulerException
+
+class PlacedInstance(object):
+    """Minimal stand-in for an Ec2 object with a known placement."""
+
+    def __init__(self, instance_id, availability_zone):
+        self._id = instance_id
+        self._availability_zone = availability_zone
+
+    def id(self):
+        return self._id
+
+    def availability_zone(self):
+        return self._availability_zone
+
+class AzSchedulerTest(unittest.TestCase):
+    """Availability Zone Scheduler Tests."""
+
+    def _fleet(self, counts):
+        """Build healthy old instances, counts being zone: instance count."""
+        instances = []
+        for zone, count in sorted(counts.items()):
+            instances += [PlacedInstance("%s-%d" % (zone, index), zone) \
+                for index in range(count)
+            ]
+        return instances
+
+    def _run(self, scheduler):
+        """Replace every old instance, returning the healthy counts seen
+        after each removal.
+        """
+        seen = []
+        launched = 0
+        while scheduler.remaining():
+            zone = scheduler.launch_zone()
+            scheduler.launched(PlacedInstance("new-%d" % (launched,), zone))
+            launched += 1
+            scheduler.removed(scheduler.next_removal())
+            seen.append(scheduler.healthy_counts())
+        return seen
+
+    def test_replacements_rebalance_zones(self):
+        """Replacements should be spread evenly over the zones."""
+        old = self._fleet({"a": 4, "b": 1, "c": 1})
+        scheduler = AzScheduler([(instance, True) for instance in old], old)
+        seen = self._run(scheduler)
+
+        self.assertEqual(seen[-1], {"a": 2, "b": 2, "c": 2})
+
+    def test_no_old_instances(self):
+        """A fleet without old instances should have nothing to schedule."""
+        new = self._fleet({"a": 2, "b": 1})
+        scheduler = AzScheduler([(instance, True) for instance in new], [])
+
+        self.assertIsNone(scheduler.launch_zone())
+        self.assertEqual(scheduler.remaining(), [])
+
+    def test_floor_is_kept(self):
+        """No zone should drop below the floor at any step."""
+        old = self._fleet({"a": 3, "b": 2, "c": 2})
+        scheduler = AzScheduler([(instance, True) for instance in old], old,
+            floor=2
+        )
+        for counts in self._run(scheduler):
+            self.assertTrue(all(count >= 2 for count in counts.values()))
+
+    def test_removals_alternate_zones(self):
+        """Removals should come from the zone with the most surplus instead
+        of emptying one zone first.
+        """
+        old = self._fleet({"a": 2, "b": 2})
+        scheduler = AzScheduler([(instance, True) for instance in old], old)
+        first = scheduler.next_removal()
+        scheduler.removed(first)
+        second = scheduler.next_removal()
+
+        self.assertNotEqual(first.availability_zone(),
+            second.availability_zone()
+        )
+
+    def test_unhealthy_instances_removed_first(self):
+        """Unhealthy instances cost no capacity and should go first."""
+        old = self._fleet({"a": 2})
+        scheduler = AzScheduler([(old[0], True), (old[1], False)], old)
+
+        self.assertEqual(scheduler.next_removal().id(), old[1].id())
+
+    def test_unreachable_floor_fails_up_front(self):
+        """A floor a zone can't keep once replaced should fail before any
+        replacement is launched.
+        """
+        old = self._fleet({"a": 2, "b": 1})
+        with self.assertRaises(SchedulerException):
+            AzScheduler([(instance, True) for instance in old], old, floor=2)
+
+    def test_removal_below_floor_fails(self):
+        """Scheduling should fail when any removal breaks the floor."""
+        old = self._fleet({"a": 1, "b": 1})
+        scheduler = AzScheduler([(instance, True) for instance in old], old)
+
+        with self.assertRaises(SchedulerException):
+            scheduler.next_removal()
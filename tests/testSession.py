@@ -0,0 +1,67 @@
+import unittest
+import os
+from rolling_deploy.session import SessionFactory, client
+from rolling_deploy.exception import AwsConnectionException
+from moto import mock_sts
+
+@mock_sts
+class SessionFactoryTest(unittest.TestCase):
+    """Session Factory Tests."""
+
+    TARGET_GROUP_ARN = ('arn:aws:elasticloadbalancing:eu-west-1:123456789012:'
+        'targetgroup/MyTG/73e2d6bc24d8a067')
+    ROLE_ARN = 'arn:aws:iam::123456789012:role/deployer'
+
+    def test_region_from_arn(self):
+        """The region should be read from an arn."""
+        self.assertEqual(SessionFactory.region_from_arn(self.TARGET_GROUP_ARN),
+            'eu-west-1'
+        )
+        self.assertIsNone(SessionFactory.region_from_arn(self.ROLE_ARN))
+
+    def test_account_from_arn(self):
+        """The account should be read from an arn."""
+        self.assertEqual(SessionFactory.account_from_arn(self.ROLE_ARN),
+            '123456789012'
+        )
+
+    def test_malformed_arn_fails(self):
+        """Parsing something that isn't an arn should fail."""
+        with self.assertRaises(AwsConnectionException):
+            SessionFactory.region_from_arn('naughtyarn')
+
+    def test_clients_are_shared(self):
+        """Clients should be built once per session and service."""
+        session = SessionFactory().get_session('eu-west-1')
+        self.assertIs(client('ec2', session), client('ec2', session))
+        self.assertIsNot(client('ec2', session), client('elbv2', session))
+        self.assertIsNot(client('ec2', session), client('ec2'))
+
+    def test_client_endpoint(self):
+        """Clients should be sent to AWS_ENDPOINT_URL when it is set."""
+        os.environ['AWS_ENDPOINT_URL'] = 'http://127.0.0.1:5000'
+        try:
+            self.assertEqual(client('ec2').meta.endpoint_url,
+                'http://127.0.0.1:5000'
+            )
+        finally:
+            del os.environ['AWS_ENDPOINT_URL']
+
+    def test_session_for_region(self):
+        """Sessions should be bound to their region and reused."""
+        factory = SessionFactory()
+        session = factory.get_session('eu-west-1')
+
+        self.assertEqual(session.region_name, 'eu-west-1')
+        self.assertIs(factory.get_session('eu-west-1'), session)
+        self.assertIsNot(factory.get_session('us-west-2'), session)
+
+    def test_assume_role_session(self):
+        """Sessions for a role should use the assumed role's credentials."""
+        factory = SessionFactory()
+        session = factory.get_session('eu-west-1', self.ROLE_ARN)
+
+        credentials = session.get_credentials()
+        self.assertEqual(session.region_name, 'eu-west-1')
+        self.assertIsNotNone(credentials.token)
+        self.assertIs(factory.get_session('eu-west-1', self.ROLE_ARN), session)
@@ -113,6 +113,21 @@ class TargetGroupTest(unittest.TestCase):
 
         self.assertEqual(set(instance_ids), set(healthy_ids))
 
+    def test_instance_health(self):
+        """The snapshot should pair every registered instance with its
+        health.
+        """
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        snapshot = target_group.instance_health()
+
+        self.assertEqual(set([instance.id() for instance, state in snapshot]),
+            set([instance['InstanceId'] for instance in \
+                self._ec2_mock.instances()])
+        )
+        self.assertEqual(set([state for instance, state in snapshot]),
+            set((TargetGroup.HEALTH_HEALTHY,))
+        )
+
     def test_is_healthy(self):
         """Test that an instance that should be healthy reports as healthy."""
         target_group = TargetGroup(self._target_group['TargetGroupArn'])
@@ -137,6 +152,50 @@ class TargetGroupTest(unittest.TestCase):
 
         self.assertTrue(target_group.wait_healthy(instance))
 
+    def test_deregistration_delay(self):
+        """Target group should report its configured deregistration delay."""
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        self.assertEqual(target_group.deregistration_delay(),
+            TargetGroup.DEFAULT_DEREGISTRATION_DELAY
+        )
+
+    def test_set_deregistration_delay(self):
+        """Changing the deregistration delay should be saved to aws."""
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        target_group.set_deregistration_delay(30)
+        self.assertEqual(target_group.deregistration_delay(), 30)
+
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        self.assertEqual(target_group.deregistration_delay(), 30)
+
+    def test_target_health(self):
+        """A registered instance should report its target health."""
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        instance = target_group.instances()[0]
+        self.assertEqual(target_group.target_health(instance)['State'],
+            TargetGroup.HEALTH_HEALTHY
+        )
+
+    def test_target_health_not_registered(self):
+        """An instance not in the group should have no target health."""
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        instance = Ec2.create_instance(self._ec2_mock.default_image())
+        self.assertIsNone(target_group.target_health(instance))
+
+    def test_target_healths(self):
+        """Target health should be reported for just the passed instances,
+        including those no longer registered.
+        """
+        target_group = TargetGroup(self._target_group['TargetGroupArn'])
+        registered = target_group.instances()[0]
+        instance = Ec2.create_instance(self._ec2_mock.default_image())
+        healths = target_group.target_healths([registered, instance])
+
+        self.assertEqual(set(healths), set((registered.id(), instance.id())))
+        self.assertEqual(healths[registered.id()]['State'],
+            TargetGroup.HEALTH_HEALTHY
+        )
+
     def test_from_load_balancer(self):
         """We should retrieve a TargetGroup object when passing it's parent
         load balancer.
@@ -0,0 +1,128 @@
+import unittest
+import os
+import tempfile
+from rolling_deploy.timing_store import TimingStore, TimingStoreException
+
+class TimingStoreTest(unittest.TestCase):
+    """Timing Store Object Tests."""
+
+    AMI = 'ami-12345678'
+    TARGET_GROUP = 'arn:aws:elasticloadbalancing:tg/MyTG'
+    INSTANCE_TYPE = 't2.micro'
+
+    def setUp(self):
+        """Start each test with an empty store file."""
+        handle, self._path = tempfile.mkstemp()
+        os.close(handle)
+        os.remove(self._path)
+
+    def tearDown(self):
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    def _seed(self, store, kind, seconds, **key):
+        for duration in seconds:
+            store.record(kind, duration, **key)
+
+    def test_record_persists(self):
+        """Recorded timings should be readable from a new store."""
+        store = TimingStore(self._path)
+        store.record(TimingStore.KIND_BOOT, 12.5, ami=self.AMI)
+
+        store = TimingStore(self._path)
+        self.assertEqual(store.observations(TimingStore.KIND_BOOT,
+            ami=self.AMI), [12.5]
+        )
+
+    def test_observations_filter_by_key(self):
+        """Only observations matching the passed key should be returned."""
+        store = TimingStore(self._path)
+        store.record(TimingStore.KIND_BOOT, 10, ami=self.AMI,
+            instance_type=self.INSTANCE_TYPE
+        )
+        store.record(TimingStore.KIND_BOOT, 50, ami='ami-other',
+            instance_type=self.INSTANCE_TYPE
+        )
+        store.record(TimingStore.KIND_DRAIN, 30, ami=self.AMI)
+
+        self.assertEqual(store.observations(TimingStore.KIND_BOOT,
+            ami=self.AMI, instance_type=self.INSTANCE_TYPE), [10]
+        )
+        self.assertEqual(set(store.observations(TimingStore.KIND_BOOT,
+            instance_type=self.INSTANCE_TYPE)), set((10, 50))
+        )
+
+    def test_percentile_needs_history(self):
+        """Percentiles should not be trusted without enough samples."""
+        store = TimingStore(self._path)
+        self._seed(store, TimingStore.KIND_HEALTH,
+            range(TimingStore.MIN_SAMPLES - 1), target_group=self.TARGET_GROUP
+        )
+        self.assertIsNone(store.percentile(TimingStore.KIND_HEALTH, 50,
+            target_group=self.TARGET_GROUP)
+        )
+
+    def test_percentile(self):
+        """Percentiles should use the nearest rank of the observations."""
+        store = TimingStore(self._path)
+        self._seed(store, TimingStore.KIND_HEALTH, range(1, 11),
+            target_group=self.TARGET_GROUP
+        )
+        self.assertEqual(store.percentile(TimingStore.KIND_HEALTH, 50,
+            target_group=self.TARGET_GROUP), 5
+        )
+        self.assertEqual(store.percentile(TimingStore.KIND_HEALTH, 99,
+            target_group=self.TARGET_GROUP), 10
+        )
+
+    def test_schedule_defaults_without_history(self):
+        """Waiters should poll right away with their default limit when
+        nothing has been recorded.
+        """
+        store = TimingStore(self._path)
+        self.assertEqual(store.schedule(TimingStore.KIND_DRAIN, 10, 30,
+            target_group=self.TARGET_GROUP), (0, 30)
+        )
+
+    def test_schedule_from_history(self):
+        """Waiters should sleep until the median and keep their default
+        limit when the history is faster than it.
+        """
+        store = TimingStore(self._path)
+        self._seed(store, TimingStore.KIND_BOOT, (20, 20, 30, 40, 40),
+            ami=self.AMI
+        )
+        first_wait, limit = store.schedule(TimingStore.KIND_BOOT, 10, 30,
+            ami=self.AMI
+        )
+        self.assertEqual(first_wait, 30)
+        self.assertEqual(limit, 30)
+
+    def test_schedule_extends_limit(self):
+        """Waiters should poll until twice the worst observed time when that
+        is past their default limit.
+        """
+        store = TimingStore(self._path)
+        self._seed(store, TimingStore.KIND_BOOT, (100, 100, 150, 200, 200),
+            ami=self.AMI
+        )
+        first_wait, limit = store.schedule(TimingStore.KIND_BOOT, 10, 5,
+            ami=self.AMI
+        )
+        self.assertEqual(first_wait, 150)
+        self.assertEqual(limit, 25)
+
+    def test_estimate_removes_poll_overshoot(self):
+        """Estimates should fall between the missed and detecting polls, so
+        a change seen on the first poll can shorten the next first wait.
+        """
+        self.assertEqual(TimingStore.estimate(100, 130, 140), 35)
+        self.assertEqual(TimingStore.estimate(100, 100, 120), 10)
+
+    def test_corrupt_store_fails(self):
+        """A store file that isn't json-lines should cause an error."""
+        with open(self._path, 'w') as handle:
+            handle.write("not json\n")
+
+        with self.assertRaises(TimingStoreException):
+            TimingStore(self._path)